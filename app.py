@@ -1,15 +1,20 @@
 import os
+import asyncio
 import logging
+import re
+import time
+import httpx
+import orjson
+import redis.asyncio
 import requests
-import json
-import socks
-import socket
+import uvloop
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.error import TimedOut, NetworkError
 
-# Enable logging
-logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+# Enable logging; set LOG_LEVEL=WARNING in production to silence the per-request chatter
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    level=os.getenv('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 # Get the bot token from environment variable
@@ -18,142 +23,490 @@ if not TOKEN:
     raise ValueError("No token provided. Set the TELEGRAM_BOT_TOKEN environment variable.")
 
 # Constants for proxy timeout
-PROXY_TIMEOUT = 10  # Increased timeout for proxy testing
-MAX_RETRIES = 10    # Increased number of retries
+PROXY_TIMEOUT = 10      # Increased timeout for proxy testing
+TCP_PROBE_TIMEOUT = 2   # cheap TCP-connect liveness pre-check
 
-def get_proxy_list():
-    url = "https://proxylist.geonode.com/api/proxy-list?country=GE&protocols=socks4&limit=500&page=1&sort_by=lastChecked&sort_type=desc"
+# Sticky-proxy state: keep reusing the last known-good proxy and only rescan
+# the pool when it fails, instead of re-testing hundreds of proxies per message
+PROXY_LIST_TTL = 600          # refetch the proxy list at most every 10 minutes
+PROXY_RECHECK_INTERVAL = 60   # trust the sticky proxy's last health check for this long
+PROXY_MAX_FAIL_RATIO = 0.5    # exclude proxies that fail more often than this
+PROXY_SCAN_CONCURRENCY = 50   # how many proxies to probe at once during a rescan
+PROXY_HEALTH_TTL = 1800       # forget success/failure verdicts after this long
+
+_current_proxy = None
+_current_proxy_checked_at = 0.0
+_proxy_list_cache = []
+_proxy_list_fetched_at = 0.0
+_proxy_health = {}  # (ip, port) -> [successes, failures]
+_proxy_health_reset_at = time.monotonic()
+
+# Optional cross-worker state: when REDIS_URL is set, the sticky proxy is
+# mirrored in Redis so it survives restarts/redeploys and is shared between
+# workers if the bot ever runs more than one process (webhook mode). The
+# polling loop itself cannot be forked — Telegram allows only one concurrent
+# getUpdates consumer per token. The CSRF token stays per-process because it
+# is bound to the client's session cookies, which die with the client.
+REDIS_URL = os.getenv('REDIS_URL')
+# Short socket timeouts so a wedged Redis degrades to the in-process path
+# instead of stalling the event loop for the OS connect timeout
+_redis = redis.asyncio.Redis.from_url(
+    REDIS_URL, decode_responses=True,
+    socket_timeout=1.0, socket_connect_timeout=1.0,
+) if REDIS_URL else None
+_REDIS_PROXY_KEY = 'penalty_check:current_proxy'
+
+async def _shared_proxy_get():
+    if _redis is None:
+        return None
+    try:
+        value = await _redis.get(_REDIS_PROXY_KEY)
+    except Exception as e:
+        logger.warning("Redis get failed: %s", e)
+        return None
+    if not value:
+        return None
+    ip, _, port = value.partition(':')
+    return (ip, port)
+
+async def _shared_proxy_set(proxy):
+    if _redis is None:
+        return
+    try:
+        await _redis.setex(_REDIS_PROXY_KEY, PROXY_LIST_TTL, f"{proxy[0]}:{proxy[1]}")
+    except Exception as e:
+        logger.warning("Redis set failed: %s", e)
+
+async def _shared_proxy_clear():
+    if _redis is None:
+        return
+    try:
+        await _redis.delete(_REDIS_PROXY_KEY)
+    except Exception as e:
+        logger.warning("Redis delete failed: %s", e)
+
+UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.60 Safari/537.36'
+
+# Static headers for the search POST; the User-Agent rides on the client
+POST_HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Origin': 'https://police.ge',
+    'Referer': 'https://police.ge/protocol/index.php?lang=en',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Language': 'en-GB,en-US;q=0.9,en;q=0.8',
+}
+
+# Shared async client bound to the current proxy, so outbound requests don't
+# block the event loop and the pooled HTTPS connection to police.ge is reused.
+# The proxy is attached here per-client instead of monkey-patching the global
+# socket module, which used to tunnel even the bot's Telegram traffic (and DNS)
+# through whatever flaky proxy was active.
+_http_client = None
+_http_client_proxy = None
+
+async def get_http_client(proxy):
+    global _http_client, _http_client_proxy
+    if _http_client is not None and _http_client_proxy == proxy:
+        return _http_client
+
+    # Publish the replacement client before any await: a concurrent handler
+    # that hits the equality check above must never be handed a client that
+    # is already closing.
+    old_client = _http_client
+    new_client = httpx.AsyncClient(
+        http2=False,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        headers={'User-Agent': UA},
+        proxy=f'socks5://{proxy[0]}:{proxy[1]}',
+    )
+    _http_client = new_client
+    _http_client_proxy = proxy
+
+    if old_client is not None:
+        # Cookies (and with them the CSRF session) die with the old client,
+        # so drop the token and its ETag too — a 304 against the old ETag
+        # would revalidate a token the new session can't use
+        _csrf_cache["token"] = None
+        _csrf_cache["exp"] = 0.0
+        _csrf_cache["etag"] = None
+        await old_client.aclose()
+
+    return new_client
+
+def get_proxy_list(force_refresh=False):
+    global _proxy_list_cache, _proxy_list_fetched_at
+    if (_proxy_list_cache and not force_refresh
+            and time.monotonic() - _proxy_list_fetched_at < PROXY_LIST_TTL):
+        return _proxy_list_cache
+
+    url = "https://proxylist.geonode.com/api/proxy-list?country=GE&protocols=socks5&limit=500&page=1&sort_by=lastChecked&sort_type=desc"
     try:
         response = requests.get(url, timeout=10)
         response.raise_for_status()
         data = response.json()
-        return [(proxy['ip'], proxy['port']) for proxy in data['data']]
+        _proxy_list_cache = [(proxy['ip'], proxy['port']) for proxy in data['data']]
+        _proxy_list_fetched_at = time.monotonic()
     except Exception as e:
-        logger.error(f"Failed to fetch proxy list: {e}")
-        return []
+        logger.error("Failed to fetch proxy list: %s", e)
+    return _proxy_list_cache
+
+def _record_proxy_result(proxy, ok):
+    stats = _proxy_health.setdefault(proxy, [0, 0])
+    stats[0 if ok else 1] += 1
+
+def _reset_proxy_health():
+    global _proxy_health_reset_at
+    _proxy_health.clear()
+    _proxy_health_reset_at = time.monotonic()
 
-def set_socks_proxy(proxy_host, proxy_port):
-    socks.set_default_proxy(socks.SOCKS4, proxy_host, int(proxy_port))
-    socket.socket = socks.socksocket
+def _expire_proxy_health():
+    """Forget stale verdicts so failed proxies get another chance eventually
+    (an excluded proxy is never re-probed, so its ratio could otherwise never
+    recover) and the health map can't grow without bound."""
+    if time.monotonic() - _proxy_health_reset_at >= PROXY_HEALTH_TTL:
+        _reset_proxy_health()
+
+def _proxy_is_healthy(proxy):
+    successes, failures = _proxy_health.get(proxy, (0, 0))
+    total = successes + failures
+    return total == 0 or failures / total <= PROXY_MAX_FAIL_RATIO
+
+async def mark_proxy_failed(proxy):
+    """Drop the sticky proxy after a real request through it failed."""
+    global _current_proxy
+    _record_proxy_result(proxy, False)
+    if _current_proxy == proxy:
+        _current_proxy = None
+        await _shared_proxy_clear()
 
 def test_proxy(proxy):
+    # Probe through this proxy only, without touching the global socket module
     try:
-        set_socks_proxy(proxy[0], proxy[1])
-        response = requests.get('https://police.ge/protocol/index.php?lang=en', timeout=PROXY_TIMEOUT)
+        response = requests.get('https://police.ge/protocol/index.php?lang=en',
+                                proxies={'https': f'socks5://{proxy[0]}:{proxy[1]}'},
+                                timeout=PROXY_TIMEOUT)
         return response.status_code == 200
     except Exception as e:
-        logger.warning(f"Proxy {proxy[0]}:{proxy[1]} failed: {str(e)}")
+        logger.warning("Proxy %s:%s failed: %s", proxy[0], proxy[1], e)
         return False
 
-def get_working_proxy():
-    proxy_list = get_proxy_list()
-    for _ in range(MAX_RETRIES):
-        for proxy in proxy_list:
-            if test_proxy(proxy):
-                logger.info(f"Working proxy found: {proxy[0]}:{proxy[1]}")
+async def _tcp_alive(proxy):
+    """Cheap liveness check: can we even open a TCP connection to the proxy?"""
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(proxy[0], int(proxy[1])),
+            timeout=TCP_PROBE_TIMEOUT)
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+async def _scan_proxies(proxies):
+    """Probe candidates concurrently and return the first proxy that works."""
+    semaphore = asyncio.Semaphore(PROXY_SCAN_CONCURRENCY)
+
+    async def probe(proxy):
+        async with semaphore:
+            # Tens-of-ms TCP connect weeds out dead proxies before paying for
+            # a full TLS handshake + page fetch through them
+            if not await _tcp_alive(proxy):
+                _record_proxy_result(proxy, False)
+                return None
+            ok = await asyncio.to_thread(test_proxy, proxy)
+        _record_proxy_result(proxy, ok)
+        return proxy if ok else None
+
+    tasks = [asyncio.create_task(probe(proxy)) for proxy in proxies]
+    try:
+        for future in asyncio.as_completed(tasks):
+            proxy = await future
+            if proxy is not None:
                 return proxy
-        logger.warning("No working proxy found, retrying from the beginning of the list...")
-    logger.error("No working proxy found after all retries")
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def find_working_proxy():
+    global _current_proxy, _current_proxy_checked_at
+
+    _expire_proxy_health()
+
+    # Fast path: the sticky proxy passed a health check recently
+    if _current_proxy is not None:
+        if time.monotonic() - _current_proxy_checked_at < PROXY_RECHECK_INTERVAL:
+            return _current_proxy
+        if await asyncio.to_thread(test_proxy, _current_proxy):
+            _record_proxy_result(_current_proxy, True)
+            _current_proxy_checked_at = time.monotonic()
+            return _current_proxy
+        logger.warning("Sticky proxy %s:%s went bad, rescanning", _current_proxy[0], _current_proxy[1])
+        await mark_proxy_failed(_current_proxy)
+
+    # Try a proxy another worker (or a previous run) left in Redis
+    shared = await _shared_proxy_get()
+    if shared is not None and _proxy_is_healthy(shared):
+        if await asyncio.to_thread(test_proxy, shared):
+            logger.info("Adopting shared proxy %s:%s", shared[0], shared[1])
+            _record_proxy_result(shared, True)
+            _current_proxy = shared
+            _current_proxy_checked_at = time.monotonic()
+            return shared
+        _record_proxy_result(shared, False)
+
+    # Scan the cached list; force one list refresh if the pool is exhausted
+    for force_refresh in (False, True):
+        proxy_list = await asyncio.to_thread(get_proxy_list, force_refresh)
+        candidates = [proxy for proxy in proxy_list if _proxy_is_healthy(proxy)]
+        if not candidates and proxy_list:
+            # Every listed proxy has a bad record; forget the verdicts and
+            # retry them all rather than never finding a proxy again
+            logger.warning("All %d listed proxies are marked unhealthy, resetting health stats",
+                           len(proxy_list))
+            _reset_proxy_health()
+            candidates = list(proxy_list)
+        proxy = await _scan_proxies(candidates)
+        if proxy is not None:
+            logger.info("Working proxy found: %s:%s", proxy[0], proxy[1])
+            _current_proxy = proxy
+            _current_proxy_checked_at = time.monotonic()
+            await _shared_proxy_set(proxy)
+            return proxy
+
+    logger.error("No working proxy found after rescanning the pool")
     return None
 
+# CSRF token cache: the token stays valid for the whole session, so refetch
+# it at most once per CSRF_TTL instead of on every user query. The lock makes
+# the refresh single-flight so concurrent handlers don't stampede the GET.
+CSRF_TTL = 300  # seconds
+_csrf_cache = {"token": None, "exp": 0.0, "etag": None}
+_csrf_lock = asyncio.Lock()
+
+# Matches the hidden csrf_token <input> in the raw bytes, so we skip both
+# decoding the page and splitting it into a list of lines
+_CSRF_RE = re.compile(rb'name=["\']csrf_token["\'][^>]*value=["\']([^"\']+)["\']')
+
+# Loose sanity check for a registration number (covers AA-000-AA style plates
+# as well as older formats) so obvious garbage never reaches police.ge
+_PLATE_RE = re.compile(r'^[A-Z0-9]{4,8}$')
+
+async def get_csrf_token(http, force_refresh=False):
+    if not force_refresh and _csrf_cache["token"] and time.monotonic() < _csrf_cache["exp"]:
+        return _csrf_cache["token"]
+
+    async with _csrf_lock:
+        # Another handler may have refreshed while we waited on the lock
+        if not force_refresh and _csrf_cache["token"] and time.monotonic() < _csrf_cache["exp"]:
+            return _csrf_cache["token"]
+
+        # Ask the server to confirm the cached page via its ETag; a tiny 304
+        # means the token is still the one we hold, with no body to download.
+        # Skipped on force_refresh, where the server already rejected the
+        # cached token and a 304 would only re-confirm it.
+        headers = {}
+        if not force_refresh and _csrf_cache["token"] and _csrf_cache["etag"]:
+            headers['If-None-Match'] = _csrf_cache["etag"]
+
+        # Stream the page and stop reading as soon as the token <input> shows
+        # up (usually in the first chunk); the rest of the body never has to
+        # cross the proxy. Searching the whole buffer each time handles a
+        # token split across chunk boundaries.
+        csrf_token = None
+        buf = bytearray()
+        async with http.stream('GET', 'https://police.ge/protocol/index.php?lang=en',
+                               headers=headers) as response:
+            if response.status_code == 304:
+                _csrf_cache["exp"] = time.monotonic() + CSRF_TTL
+                return _csrf_cache["token"]
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(4096):
+                buf.extend(chunk)
+                m = _CSRF_RE.search(buf)
+                if m:
+                    csrf_token = m.group(1).decode('ascii')
+                    break
+
+        if csrf_token:
+            _csrf_cache["token"] = csrf_token
+            _csrf_cache["exp"] = time.monotonic() + CSRF_TTL
+            _csrf_cache["etag"] = response.headers.get('ETag')
+        return csrf_token
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text('Welcome! Please enter your vehicle registration number to check for fines.')
 
-async def check_fines(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    vehicle_number = update.message.text.strip().upper()
-    logger.info(f"Checking fines for vehicle number: {vehicle_number}")
-    
-    proxy = get_working_proxy()
+# Per-plate result cache: repeated queries for the same plate within
+# RESULT_TTL reuse the previous reply, and concurrent duplicates await the
+# same in-flight lookup instead of issuing parallel upstream requests
+RESULT_TTL = 60  # seconds
+_result_cache = {}  # plate -> (expires_at, message)
+_inflight = {}      # plate -> asyncio.Future
+
+async def get_fines_message(vehicle_number):
+    now = time.monotonic()
+    # Opportunistically purge expired entries
+    for plate in [p for p, (exp, _) in _result_cache.items() if exp <= now]:
+        del _result_cache[plate]
+
+    cached = _result_cache.get(vehicle_number)
+    if cached is not None:
+        logger.info("Returning cached result for vehicle number: %s", vehicle_number)
+        return cached[1]
+
+    future = _inflight.get(vehicle_number)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[vehicle_number] = future
+    try:
+        message, cacheable = await fetch_fines_message(vehicle_number)
+        if cacheable:
+            _result_cache[vehicle_number] = (time.monotonic() + RESULT_TTL, message)
+        future.set_result(message)
+        return message
+    finally:
+        del _inflight[vehicle_number]
+        if not future.done():
+            future.cancel()
+
+async def fetch_fines_message(vehicle_number):
+    """Query police.ge and return (reply text, whether the reply is cacheable)."""
+    proxy = await find_working_proxy()
     if not proxy:
-        await update.message.reply_text("Sorry, couldn't find a working proxy. Please try again later.")
-        return
+        return "Sorry, couldn't find a working proxy. Please try again later.", False
 
-    set_socks_proxy(proxy[0], proxy[1])
+    http = await get_http_client(proxy)
 
     try:
-        # First request to get the CSRF token and cookies
-        session = requests.Session()
-        response = session.get('https://police.ge/protocol/index.php?lang=en', 
-                               headers={
-                                   'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.60 Safari/537.36'
-                               },
-                               timeout=30)
-        response.raise_for_status()
-        
-        # Extract CSRF token from the response
-        csrf_token = None
-        for line in response.text.split('\n'):
-            if 'csrf_token' in line:
-                csrf_token = line.split('value="')[1].split('"')[0]
+        # POST the search, refreshing the cached CSRF token once if it went stale
+        result = None
+        for attempt in range(2):
+            csrf_token = await get_csrf_token(http, force_refresh=attempt > 0)
+            if not csrf_token:
+                logger.error("Failed to extract CSRF token")
+                return "Sorry, couldn't retrieve the necessary information. Please try again later.", False
+
+            logger.info("CSRF token obtained: %s", csrf_token)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Cookies: %s", dict(http.cookies))
+
+            data = {
+                'firstResult': '0',
+                'protocolAuto': vehicle_number,
+                'csrf_token': csrf_token
+            }
+            response = await http.post('https://police.ge/protocol/index.php?url=protocols/searchByAuto',
+                                       headers=POST_HEADERS,
+                                       data=data)
+
+            # police.ge may reject a stale token with a 4xx instead of a
+            # success:false body; treat that as token-stale, not as an error
+            if response.is_client_error and attempt == 0:
+                logger.warning("Search POST returned %s, refreshing the CSRF token and retrying",
+                               response.status_code)
+                continue
+            response.raise_for_status()
+
+            # Work on the raw bytes throughout; the body is only decoded to
+            # str at the (rare) log sites that actually emit it
+            body = response.content
+
+            logger.debug("Response status code: %s", response.status_code)
+            logger.debug("Response headers: %s", response.headers)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response content: %s", body.decode('utf-8', 'replace'))
+
+            try:
+                result = orjson.loads(body)
+            except orjson.JSONDecodeError:
+                result = None
+
+            if result is not None and result['success']:
                 break
-        
-        if not csrf_token:
-            logger.error("Failed to extract CSRF token")
-            await update.message.reply_text("Sorry, couldn't retrieve the necessary information. Please try again later.")
-            return
-        
-        logger.info(f"CSRF token obtained: {csrf_token}")
-        logger.info(f"Cookies: {session.cookies.get_dict()}")
-        
-        # Second request to check for fines
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.6367.60 Safari/537.36',
-            'Origin': 'https://police.ge',
-            'Referer': 'https://police.ge/protocol/index.php?lang=en',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'en-GB,en-US;q=0.9,en;q=0.8',
-        }
-        data = {
-            'firstResult': '0',
-            'protocolAuto': vehicle_number,
-            'csrf_token': csrf_token
-        }
-        response = session.post('https://police.ge/protocol/index.php?url=protocols/searchByAuto', 
-                                headers=headers, 
-                                data=data,
-                                timeout=30)
-        response.raise_for_status()
-        
-        logger.info(f"Response status code: {response.status_code}")
-        logger.info(f"Response headers: {response.headers}")
-        logger.info(f"Response content: {response.text}")
-        
-        result = response.json()
+
+            # A rejected POST usually means the cached token expired server-side
+            if attempt == 0:
+                logger.warning("Search POST was rejected, refreshing the CSRF token and retrying")
+
+        if result is None:
+            logger.error("Response content: %s", body.decode('utf-8', 'replace'))
+            return "Sorry, couldn't process the response from the server. The response wasn't in the expected format.", False
+
         if result['success']:
             fines_count = result['data']['count']
             if fines_count > 0:
                 fines = result['data']['results']
-                message = f"Found {fines_count} fine(s) for vehicle {vehicle_number}:\n\n"
-                for fine in fines:
-                    message += f"Date: {fine['violationDate']}\n"
-                    message += f"Amount: {fine['protocolAmount']} GEL\n"
-                    message += f"Due date: {fine['lastDate']}\n\n"
-            else:
-                message = f"No fines found for vehicle {vehicle_number}."
-        else:
-            message = f"The server reported an error: {result.get('message', 'Unknown error')}"
-    
-    except requests.RequestException as e:
-        logger.error(f"Request error: {e}")
-        message = f"Sorry, there was an error checking for fines: {str(e)}"
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {e}")
-        logger.error(f"Response content: {response.text}")
-        message = "Sorry, couldn't process the response from the server. The response wasn't in the expected format."
+                parts = [f"Found {fines_count} fine(s) for vehicle {vehicle_number}:\n"]
+                parts.extend(f"Date: {fine['violationDate']}\n"
+                             f"Amount: {fine['protocolAmount']} GEL\n"
+                             f"Due date: {fine['lastDate']}\n"
+                             for fine in fines)
+                return "\n".join(parts), True
+            return f"No fines found for vehicle {vehicle_number}.", True
+
+        return f"The server reported an error: {result.get('message', 'Unknown error')}", False
+
+    except httpx.TransportError as e:
+        # Only connection-level failures implicate the proxy; an HTTP status
+        # error came from police.ge over a working tunnel
+        logger.error("Request error: %s", e)
+        await mark_proxy_failed(proxy)
+        return f"Sorry, there was an error checking for fines: {str(e)}", False
+    except httpx.HTTPError as e:
+        logger.error("Request error: %s", e)
+        return f"Sorry, there was an error checking for fines: {str(e)}", False
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        message = f"An unexpected error occurred: {str(e)}"
-    
+        logger.error("Unexpected error: %s", e)
+        return f"An unexpected error occurred: {str(e)}", False
+
+async def check_fines(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    vehicle_number = update.message.text.strip().upper()
+    if not _PLATE_RE.match(vehicle_number):
+        await update.message.reply_text("That doesn't look like a vehicle registration number. Please enter something like AA000AA.")
+        return
+
+    logger.info("Checking fines for vehicle number: %s", vehicle_number)
+
+    message = await get_fines_message(vehicle_number)
+
     try:
         await update.message.reply_text(message)
     except (TimedOut, NetworkError) as e:
-        logger.error(f"Error sending message to user: {e}")
+        logger.error("Error sending message to user: %s", e)
         await update.message.reply_text("Sorry, there was an error sending the response. Please try again later.")
 
+async def post_init(application: Application) -> None:
+    # Warm the proxy and CSRF token in the background so the first user after
+    # a restart doesn't pay the cold-start latency; failures are non-fatal and
+    # simply leave the warm-up to the first real query.
+    async def warm_up():
+        try:
+            proxy = await find_working_proxy()
+            if proxy:
+                http = await get_http_client(proxy)
+                await get_csrf_token(http)
+                logger.info("Warm-up complete: proxy and CSRF token are ready")
+        except Exception as e:
+            logger.warning("Startup warm-up failed: %s", e)
+
+    application.create_task(warm_up())
+
+async def post_shutdown(application: Application) -> None:
+    if _http_client is not None:
+        await _http_client.aclose()
+
 def main() -> None:
-    application = Application.builder().token(TOKEN).build()
+    uvloop.install()
+
+    application = Application.builder().token(TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, check_fines))